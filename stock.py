@@ -1,11 +1,19 @@
 """
 Stock Market Simulator
 README:
-    Please install prettytable before running this script:
-    `pip install prettytable`
+    Please install prettytable and numpy before running this script:
+    `pip install prettytable numpy`
+    Optionally install numba to make NEXT-DAY faster:
+    `pip install numba`
 
 USAGE:
-    python stock.py [number of stocks (default: 10)]
+    python stock.py [number of stocks (default: 10)] [--days N]
+    N is the number of days you plan to play, used to preallocate memory
+    Simulate the stock prices after DAYS days TRIALS times, without playing:
+    python stock.py [number of stocks] --simulate DAYS,TRIALS
+    Commands can also be read from a file, one command per line:
+    python stock.py [number of stocks] --script commands.txt
+    python stock.py [number of stocks] < commands.txt
 
 MISC:
     Formatting: Black
@@ -14,79 +22,185 @@ MISC:
 Hobby project, nothing serious here
 """
 
+from __future__ import annotations
+
+import argparse
 import random
 import sys
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, TextIO
 
+import numpy as np
 import prettytable
 
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    # numba is optional, we fall back to numpy if it is not installed
+    NUMBA_AVAILABLE = False
+
+    def njit(  # type: ignore[no-redef]
+            *_args: Any, **_kwargs: Any
+    ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Do nothing decorator used when numba is not installed"""
+        return lambda function: function
+
+    def prange(*args: int) -> range:  # type: ignore[no-redef]
+        """Same as range(), used in place of numba.prange"""
+        return range(*args)
+
+
 # year-month-day-version
 VERSION = "2024.01.25-4"
 # how many decimal places we want the stock price & percentage change to have
 PRECISION = 1
-
-
-def pseudo_norm() -> float:
-    """Generate a value between 1-10000 in a normal distribution"""
-    # https://stackoverflow.com/a/70780909
-    # count is the number of dice rolls
-    count = random.randint(1, 6) * random.randint(1, 6)
-    # Central Limit Theorem
-    # Sum of 2 dice rolls is similar to a normal distribution
-    # 10000 because we want more precision for stock price change
-    # e.g. +1.14%
-    values = sum((random.randint(1, 10000) for _ in range(count)))
-    # return the average of the values
-    return values / count
-
-
-def get_random_name() -> str:
-    """Generate a random company name"""
-    list_of_endings = [
-        " Inc.",
-        " Corp.",
-        " Ltd.",
-        " Co.",
-        " LLC",
-        " & Co.",
-        " Group",
-        " Holdings",
-        " Company",
-    ]
-    # Generate 3 character name, e.g. 'ABC' 'XYZ' 'BYD'
-    # 65-90 is A-Z in ASCII
-    final_name = [chr(random.randint(65, 90)) for _ in range(3)]
-    # Append the ending
-    final_name += random.choice(list_of_endings)
+# stock prices are stored as integers in units of 10 ** -PRECISION,
+# e.g. 123.4 is stored as 1234, so no rounding is needed after each update
+PRICE_SCALE = 10**PRECISION
+# default number of days the stock history has space for, see Market.__init__()
+HISTORY_DAYS = 15
+# endings used for generating company names
+_ENDINGS = (
+    " Inc.",
+    " Corp.",
+    " Ltd.",
+    " Co.",
+    " LLC",
+    " & Co.",
+    " Group",
+    " Holdings",
+    " Company",
+)
+# funny names that have a small chance to replace the generated name
+_EASTER_EGGS = ("GameStop", "Eric15342335", "原神，启动！")
+# Pseudo-normal values used to be the average of {count} dice rolls between 1-10000,
+# where count is the product of 2 dice rolls (Central Limit Theorem)
+# https://stackoverflow.com/a/70780909
+# Now we draw from a normal distribution directly, with the same mean and
+# standard deviation as the dice rolls:
+# variance of the average of {count} rolls is (10000 ** 2 - 1) / 12 / count,
+# and the average of 1 / count over all 36 dice combinations is (sum(1 / dice) / 6) ** 2
+# (about 1179, the old version had heavier tails since count can be 1)
+PSEUDO_NORM_MEAN = 5000.5
+PSEUDO_NORM_SIGMA = (
+    ((10000**2 - 1) / 12) ** 0.5 * sum(1 / dice for dice in range(1, 7)) / 6
+)
+# numpy random number generator, used for generating prices of all stocks at once
+_RNG = np.random.default_rng()
+
+
+def pseudo_norm_vec(n: int) -> np.ndarray:
+    """Generate {n} values between 1-10000 in a normal distribution at once"""
+    # See PSEUDO_NORM_MEAN and PSEUDO_NORM_SIGMA for explanation
+    return np.clip(_RNG.normal(PSEUDO_NORM_MEAN, PSEUDO_NORM_SIGMA, n), 1, 10000)
+
+
+def advance_prices_numpy(prices: np.ndarray) -> None:
+    """Generate new stock prices in place with numpy, {prices} can have any shape
+    Used instead of the numba functions below when numba is not installed"""
+    values = pseudo_norm_vec(prices.size).reshape(prices.shape)
+    prices += np.rint(prices * (values - 5000) / 10000).astype(np.int64)
+
+
+# The numba functions below have explicit signatures,
+# so they are compiled (or loaded from cache) when the module is imported
+# instead of when NEXT-DAY is used for the first time
+@njit("int64(int64)", cache=True, fastmath=True)
+def _next_price(price: int) -> int:
+    """Return the new price of one stock, compiled to machine code by numba
+    See Market.next_day() for explanation"""
+    # Same as pseudo_norm_vec(), but for one value
+    value = min(max(np.random.normal(PSEUDO_NORM_MEAN, PSEUDO_NORM_SIGMA), 1), 10000)
+    return price + round(price * (value - 5000) / 10000)
+
+
+@njit("void(int64[:])", cache=True, fastmath=True, parallel=True)
+def advance_prices(prices: np.ndarray) -> None:
+    """Generate new stock prices in place, compiled to machine code by numba
+    Same as advance_prices_numpy(), but without creating any
+    temporary arrays, and the stocks are split between all CPU cores"""
+    for i in prange(prices.shape[0]):
+        prices[i] = _next_price(prices[i])
+
+
+@njit("int64[:, :](int64[:], int64, int64)", cache=True, fastmath=True, parallel=True)
+def simulate_prices(prices: np.ndarray, days: int, trials: int) -> np.ndarray:
+    """Monte Carlo simulation, compiled to machine code by numba
+    Run {trials} independent markets for {days} days, all starting from {prices}
+    Return the final prices, one row per trial"""
+    result = np.empty((trials, prices.shape[0]), dtype=np.int64)
+    # The days of a trial depend on each other, but the trials do not,
+    # so the trials are split between all CPU cores
+    for trial in prange(trials):
+        for i in range(prices.shape[0]):
+            price = prices[i]
+            for _ in range(days):
+                price = _next_price(price)
+            result[trial, i] = price
+    return result
+
+
+def get_random_names(count: int) -> list[str]:
+    """Generate {count} random company names at once
+    All random values are sampled in a few numpy calls"""
+    # Generate 3 character names, e.g. 'ABC' 'XYZ' 'BYD'
+    # 3 ASCII codes of A-Z (65-90) for each name, decoded as one string
+    letters = (
+        (_RNG.integers(0, 26, size=(count, 3), dtype=np.uint8) + 65)
+        .tobytes()
+        .decode("ascii")
+    )
+    endings = _RNG.choice(_ENDINGS, size=count).tolist()
     # Easter egg
     # 1/30 chance of appearing
-    if random.randint(1, 30) == 1:
-        # instead of a random name, we pick a funny name from the list below
-        final_name = random.choice(["GameStop", "Eric15342335", "原神，启动！"])
-    # Join the strings inside the list final_name
-    # return the name as a string
-    return "".join(final_name)
+    easter_eggs = (_RNG.integers(1, 31, count) == 1).tolist()
+    return [
+        (
+            random.choice(_EASTER_EGGS)
+            if easter_egg
+            else letters[3 * i : 3 * i + 3] + ending
+        )
+        for i, (ending, easter_egg) in enumerate(zip(endings, easter_eggs))
+    ]
 
 
 class Stock:
     """Stock class representing a real life stock with price, (player) inventory,
-    and price history"""
+    and price history
+    Note: The actual data is stored inside Market, this class is only a view
+    of one stock in the market"""
 
-    def __init__(self, order: int) -> None:
-        """Set stock price, initialize inventory count, stock history, stock name"""
-        # Generate a stock starting price
-        # We want stock price above 100 to appear less often
-        # so there is a nested random.uniform
-        self.price = round(random.uniform(10, random.uniform(100, 200)), PRECISION)
-        # No starting stock
-        self.inventory = 0
-        # Stock.history is a list of stock prices
-        # where [-1] is the most recent price
-        self.history = [self.price]
+    def __init__(self, market: Market, order: int, name: str) -> None:
+        """Set the market that stores the stock data, and the stock name"""
+        self.market = market
         # index is used for buying stocks
         # and simplify a lot of things
         self.index = order
-        # Generate a random stock name
-        self.name = get_random_name()
+        # position of this stock inside the market arrays
+        self._i = order - 1
+        self.name = name
+
+    @property
+    def price(self) -> float:
+        """Current stock price"""
+        return float(self.market.prices[self._i] / PRICE_SCALE)
+
+    @property
+    def inventory(self) -> int:
+        """Number of stocks owned by player"""
+        return int(self.market.inventory[self._i])
+
+    @inventory.setter
+    def inventory(self, value: int) -> None:
+        self.market.inventory[self._i] = value
+
+    @property
+    def history(self) -> list[float]:
+        """List of stock prices, where [-1] is the most recent price"""
+        return (self.market.history[:, self._i] / PRICE_SCALE).tolist()
 
     def purchase_test(self, amount: int, balance: float) -> bool:
         """Return True if player has enough money to buy {amount} stocks"""
@@ -94,7 +208,8 @@ class Stock:
         # so we need to check if player has enough stock to sell
         if amount < 0:
             return self.inventory >= -amount
-        return balance - self.actual_price(amount) >= 0
+        # Same as Stock.actual_price(amount), without the extra method call
+        return balance >= amount * self.price * FEE_MULT
 
     def sell_test(self, amount: int, balance: float) -> bool:
         """Just an alias of Stock.purchase_test()
@@ -103,28 +218,24 @@ class Stock:
 
     def actual_price(self, amount: int) -> float:
         """Return actual price of {amount} stocks, including trading fees"""
-        return amount * self.price * (1 + STOCK_TRADE_FEE_PERCENTAGE / 100)
+        return amount * self.price * FEE_MULT
 
-    def purchase(
-            self, amount: int, balance: float, trading_fees_percentage: float
-    ) -> tuple[float, float]:
+    def purchase(self, amount: int, balance: float) -> tuple[float, float]:
         """Deduct money and increase inventory, and return new balance value
         Warning! This assumes player has enough money to purchase!
         You should use Stock.purchase_test() or Stock.sell_Test() before using this function!"""
         # Increase stock count in inventory
-        assert amount != 0, "Amount cannot be 0!"
-        assert amount.is_integer(), "Amount must be an integer!"
         self.inventory += amount
-        if amount < 0:
-            # If amount is negative, it means player is selling,
-            # so we need to change the sign of trading_fees_percentage
-            # otherwise the player will get more money than the stock value
-            # Instead of losing money when selling a stock
-            trading_fees_percentage = -trading_fees_percentage
-        fee_cost = round(amount * self.price * trading_fees_percentage / 100, PRECISION)
+        # Value of the stocks, negative if player is selling
+        notional = amount * self.price
+        # Trading fees are always paid, whether buying or selling,
+        # so abs() is used instead of checking the sign of amount
+        # otherwise the player will get more money than the stock value
+        # Instead of losing money when selling a stock
+        fee_cost = round(abs(notional) * FEE_FRAC, PRECISION)
         # return the fee_cost for display trading fees to player
         return (
-            balance - amount * self.price - fee_cost,
+            balance - notional - fee_cost,
             fee_cost,
         )
 
@@ -132,183 +243,510 @@ class Stock:
         """Return amount of stock that can be bought with current balance"""
         # Since we introduced trading fees, we need to calculate the actual price
         # int() is used to round down the value
-        return int(balance / self.actual_price(1))
-
-    def next_day(self) -> None:
-        """Generate new stock price based on current stock price
-        the new stock price is a random value between -50% and 50% of the current stock price"""
-        self.price += round(self.price * (pseudo_norm() - 5000) / 10000, PRECISION)
-        # Boundary checking
-        # Well...
-        assert self.price > 0, "Stock price cannot be negative!"
-        # Insert new stock price into stock history
-        self.update_stock_history()
-
-    def update_stock_history(self) -> list:
-        """Insert current stock value into its history list"""
-        # Insert new stock price as the end of the list [-1]
-        self.history += [self.price]
-        # If someone wants to see the history of the stock
-        # Here it is
-        return self.history
+        # Same as Stock.actual_price(1), without the extra method call
+        return int(balance / (self.price * FEE_MULT))
 
     def get_average_price(self, days: int) -> float:
         """Return average stock value of the most recent {days} days"""
-        # If stock history is shorter than {days}, return average of all stock history
-        days = min(len(self.history), days)
-        # First, revert the list using [::-1]
-        # Next, get the first {days} elements using [0:days]
-        return round(sum(self.history[::-1][0:days]) / days, PRECISION)
+        # The averages of all stocks are calculated at once by the market
+        return float(self.market.get_average_price_all(days)[self._i])
 
     def get_price_change(self) -> tuple[float, float]:
         """Return change in price and percentage change in price"""
-        # If stock history is shorter than 2 days, return 0
-        # No price change so
-        if len(self.history) < 2:
-            return 0, 0
-        # Numerical change
-        change = self.history[-1] - self.history[-2]
-        # Percentage change
-        percentage = change / self.history[-2]
-        assert percentage < 1, "Percentage change cannot be greater than 1!"
-        assert percentage > -1, "Percentage change cannot be less than -1!"
-        # Return rounded values
-        return round(change, PRECISION), round(percentage * 100, PRECISION)
+        # The price changes of all stocks are calculated at once by the market
+        change, percentage = self.market.get_price_change_all()
+        return change[self._i].item(), percentage[self._i].item()
+
+
+class Market:
+    """Market class storing the data of all stocks as arrays,
+    so we can update all stocks at once with numpy, instead of
+    looping over every Stock object"""
+
+    def __init__(self, count: int, days: int = HISTORY_DAYS) -> None:
+        """Set stock prices, initialize inventory count, stock history, stocks
+        {days} is the number of days the history has space for before it has to grow,
+        set it to the length of the game to avoid growing the history"""
+        # Generate stock starting prices
+        # We want stock price above 100 to appear less often
+        # so there is a nested uniform
+        # Market.prices are integers, see PRICE_SCALE
+        self.prices = np.rint(
+            _RNG.uniform(10, _RNG.uniform(100, 200, count)) * PRICE_SCALE
+        ).astype(np.int64)
+        # No starting stock
+        self.inventory = np.zeros(count, dtype=np.int64)
+        # Stock history of all stocks is stored in one 2D array,
+        # one row per day, where only the first Market.days rows are used
+        # The array doubles in size when it is full, see Market.update_stock_history()
+        # int32 is used to halve the memory needed, prices up to 214748364.7
+        # fit in it, if a price gets larger the array is changed to int64
+        # one more row for the starting prices
+        self._history = np.empty((days + 1, count), dtype=np.int32)
+        self._history[0] = self.prices
+        self.days = 1
+        # get_average_price_all() and get_price_change_all() only change on a new day,
+        # so we cache their results together with the day they were calculated
+        self._average_cache = (0, 0, np.empty(0))
+        self._change_cache: tuple[int, np.ndarray, np.ndarray] = (
+            0,
+            np.empty(0),
+            np.empty(0),
+        )
+        # Stock objects for accessing each stock
+        # all stock names are generated at once
+        self.stocks = [
+            Stock(self, order, name)
+            for order, name in enumerate(get_random_names(count), start=1)
+        ]
+
+    def next_day(self) -> None:
+        """Generate new stock prices based on current stock prices
+        the new stock price is a random value between -50% and 50% of the current stock price"""
+        if NUMBA_AVAILABLE:
+            advance_prices(self.prices)
+        else:
+            advance_prices_numpy(self.prices)
+        # Boundary checking
+        # One check for all stocks, see Market.validate_state() for the others
+        # min() does not create a temporary array like np.all(self.prices > 0),
+        # initial=1 is needed for markets with no stocks
+        # and like any assert, this is skipped when running `python -O stock.py`
+        assert self.prices.min(initial=1) > 0, "Stock price cannot be negative!"
+        # Insert new stock prices into stock history
+        self.update_stock_history()
+
+    def simulate(self, days: int, trials: int) -> np.ndarray:
+        """Run {trials} independent simulations of the next {days} days,
+        starting from the current stock prices, without changing this market
+        Return the final prices of all stocks, one row per trial, see PRICE_SCALE"""
+        if NUMBA_AVAILABLE:
+            return simulate_prices(self.prices, days, trials)
+        # Every row is one trial, all trials are updated at the same time
+        prices = np.tile(self.prices, (trials, 1))
+        for _ in range(days):
+            advance_prices_numpy(prices)
+        return prices
+
+    @property
+    def history(self) -> np.ndarray:
+        """Stock prices of all stocks, one row per day,
+        where [-1] is the most recent prices"""
+        return self._history[: self.days]
+
+    def get_average_price_all(self, days: int) -> np.ndarray:
+        """Return average stock value of all stocks of the most recent {days} days"""
+        if self._average_cache[:2] == (self.days, days):
+            return self._average_cache[2]
+        # If stock history is shorter than {days}, slicing returns all stock history
+        average = np.round(
+            self.history[-days:].mean(axis=0) / PRICE_SCALE, PRECISION
+        )
+        self._average_cache = (self.days, days, average)
+        return average
+
+    def get_price_change_all(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return change in price and percentage change in price of all stocks"""
+        if self._change_cache[0] == self.days:
+            return self._change_cache[1], self._change_cache[2]
+        if self.days < 2:
+            # If stock history is shorter than 2 days, return 0
+            # No price change so
+            change = np.zeros(len(self.prices), dtype=np.int64)
+            percentage = change
+        else:
+            previous = self.history[-2].astype(np.int64)
+            # Numerical change, in units of 10 ** -PRECISION
+            units = self.history[-1] - previous
+            # change is an integer, so dividing it gives the rounded value directly
+            change = units / PRICE_SCALE
+            percentage = np.round(units / previous * 100, PRECISION)
+        self._change_cache = (self.days, change, percentage)
+        return change, percentage
+
+    def get_affordance_all(self, balance: float) -> np.ndarray:
+        """Return amount of each stock that can be bought with current balance"""
+        # Same as Stock.get_affordance(), astype() rounds down like int()
+        return (balance / (self.prices / PRICE_SCALE * FEE_MULT)).astype(np.int64)
+
+    def validate_state(self) -> None:
+        """Check that the market data makes sense, raise AssertionError if not
+        These checks are not run during the game, call this when debugging"""
+        assert np.all(self.prices > 0), "Stock price cannot be negative!"
+        assert np.all(self.inventory >= 0), "Inventory cannot be negative!"
+        if self.days >= 2:
+            # Percentage change of all stocks
+            percentage = (self.history[-1] - self.history[-2]) / self.history[-2]
+            assert np.all(percentage < 1), "Percentage change cannot be greater than 1!"
+            assert np.all(percentage > -1), "Percentage change cannot be less than -1!"
+
+    def update_stock_history(self) -> None:
+        """Insert current stock prices into the history array"""
+        if self.days == self._history.shape[0]:
+            # The array is full, double its size
+            self._history = np.concatenate(
+                (self._history, np.empty_like(self._history))
+            )
+        if (
+                self._history.dtype != self.prices.dtype
+                and self.prices.max(initial=0) > np.iinfo(self._history.dtype).max
+        ):
+            # Prices are too large for int32, use the same type as prices
+            # initial=0 is needed for markets with no stocks
+            self._history = self._history.astype(self.prices.dtype)
+        # Insert new stock prices as the end of the history [-1]
+        self._history[self.days] = self.prices
+        self.days += 1
 
 
 # Game settings
-# How many stocks to choose?
+# How many stocks to choose? (default value)
 STOCK_COUNT = 10
 # Starting money
 MONEY = 1000
 # Stock trading fees in percentage
 STOCK_TRADE_FEE_PERCENTAGE = 0.5
-# support command line argument $1 for STOCK_COUNT
-if len(sys.argv) == 2:
-    STOCK_COUNT = int(sys.argv[1])
-
-# initialize stock
-# \n looks ugly
-print()
-print("Initializing game....")
-
-# Initialize all Stocks object and put them into a list
-stock_list = [Stock(count) for count in range(1, STOCK_COUNT + 1)]
-
-print(f"Number of stocks: {STOCK_COUNT}")
-print(f"Default money: {MONEY}")
-print(f"Default precision: {PRECISION}")
-print(f"Stock trading fees: {STOCK_TRADE_FEE_PERCENTAGE}%")
-
-print()
-print(f"Welcome to Stock Market Simulator {VERSION}!")
-
-
-def display_stock_information_table(
-        stock_list_variable: list[Stock], balance: float
-) -> None:
+# Trading fees as a fraction of the stock value, and
+# the multiplier for the actual price of buying stocks
+# calculated once here instead of every trade
+FEE_FRAC = STOCK_TRADE_FEE_PERCENTAGE / 100
+FEE_MULT = 1 + FEE_FRAC
+
+
+@dataclass
+class GameState:
+    """Everything the commands need to know about the current game"""
+
+    market: Market
+    money: float
+    # Where the commands are read from, see read_input()
+    source: TextIO = field(default_factory=lambda: sys.stdin)
+
+
+def read_input(prompt: str, source: TextIO) -> str:
+    """Read one line of input from the player
+    If {source} is not a terminal, e.g. `python stock.py < commands.txt`,
+    the prompt is not printed and EOFError is raised when there are no more lines"""
+    if source.isatty():
+        return input(prompt)
+    line = source.readline()
+    if not line:
+        raise EOFError
+    return line.rstrip("\n")
+
+
+# The stock information table is created once and reused,
+# only the rows are replaced every time it is displayed
+_STOCK_TABLE = prettytable.PrettyTable()
+_STOCK_TABLE.field_names = [
+    "Index",
+    "Stock name",
+    "Price",
+    "Change",
+    "Inventory",
+    "Affordable amount",
+    "Avg price (5d)",
+]
+# Same for the inventory table
+_INVENTORY_TABLE = prettytable.PrettyTable()
+_INVENTORY_TABLE.field_names = ["Stock Name", "Inventory"]
+
+
+def display_stock_information_table(market: Market, balance: float) -> None:
     """Display stock information table
     We put it into a separate function because It is used in both
     next-day and display command"""
     print("Current stock price:")
+    # Most of the columns are calculated for all stocks at once by the market
+    # tolist() turns them into python numbers for prettytable
+    prices = (market.prices / PRICE_SCALE).tolist()
+    changes, percentages = (array.tolist() for array in market.get_price_change_all())
+    inventories = market.inventory.tolist()
+    affordances = market.get_affordance_all(balance).tolist()
+    averages = market.get_average_price_all(5).tolist()
     # See prettytable manual for explanation
-    to_be_printed = prettytable.PrettyTable()
-    to_be_printed.field_names = [
-        "Index",
-        "Stock name",
-        "Price",
-        "Change",
-        "Inventory",
-        "Affordable amount",
-        "Avg price (5d)",
-    ]
-    # for each stock
-    for stock_objects in stock_list_variable:
-        # reduce the variable length
-        _a = stock_objects.get_price_change()
-        to_be_printed.add_row(
-            [
-                stock_objects.index,
-                stock_objects.name,
-                round(stock_objects.price, PRECISION),
-                f"{_a[0] if _a[0] < 0 else '+' + str(_a[0])}"
-                " "
-                f"({_a[1] if _a[1] < 0 else '+' + str(_a[1])}%)",
-                stock_objects.inventory,
-                stock_objects.get_affordance(balance),
-                stock_objects.get_average_price(5),
-            ]
+    rows = [
+        [
+            stock.index,
+            stock.name,
+            price,
+            f"{change if change < 0 else '+' + str(change)}"
+            " "
+            f"({percentage if percentage < 0 else '+' + str(percentage)}%)",
+            inventory,
+            affordance,
+            average,
+        ]
+        # for each stock
+        for stock, price, change, percentage, inventory, affordance, average in zip(
+            market.stocks,
+            prices,
+            changes,
+            percentages,
+            inventories,
+            affordances,
+            averages,
         )
-    print(to_be_printed)
+    ]
+    _STOCK_TABLE.clear_rows()
+    _STOCK_TABLE.add_rows(rows)
+    print(_STOCK_TABLE)
     print(f"Your current balance is {round(balance, PRECISION)}")
 
 
-while True:
-    display_stock_information_table(stock_list, MONEY)
+def do_buy(state: GameState) -> bool:
+    """BUY command: buy stocks"""
+    stock_to_buy = int(read_input("Input stock index to buy: ", state.source))
+    amount_to_buy = int(read_input("Input amount of stock to buy: ", state.source))
+    stock = state.market.stocks[stock_to_buy - 1]
+    # See Stock.purchase_test() for explanation
+    if stock.purchase_test(amount_to_buy, state.money):
+        state.money, fee_deducted = stock.purchase(amount_to_buy, state.money)
+        print(
+            f"Successfully bought {amount_to_buy} stock(s)!",
+            f"Paid {fee_deducted} for trading fees.",
+        )
+    else:
+        print("You do not have enough money to buy!")
+    return False
+
+
+def do_sell(state: GameState) -> bool:
+    """SELL command: sell stocks"""
+    stock_to_sell = int(read_input("Input stock index to sell: ", state.source))
+    amount_to_sell = int(read_input("Input amount of stock to sell: ", state.source))
+    stock = state.market.stocks[stock_to_sell - 1]
+    if stock.sell_test(amount_to_sell, state.money):
+        state.money, fee_deducted = stock.purchase(-amount_to_sell, state.money)
+        print(
+            f"Successfully sold {amount_to_sell} stock(s)!",
+            f"Paid {fee_deducted} for trading fees.",
+        )
+    else:
+        print("You do not have enough stock to sell!")
+    return False
+
+
+def do_inventory(state: GameState) -> bool:
+    """INVENTORY command: display balance and inventory"""
+    # I think we can remove this part of code in newer versions
+    # Since the user can use DISPLAY command to view inventory
+    # This is redundant
+    # But I will keep it here for now
+    print(f"Your current balance is {state.money}")
+    print("Your current inventory is:")
+    _INVENTORY_TABLE.clear_rows()
+    _INVENTORY_TABLE.add_rows(
+        [[stocks.name, stocks.inventory] for stocks in state.market.stocks]
+    )
+    print(_INVENTORY_TABLE)
+    return False
+
+
+def do_next_day(state: GameState) -> bool:
+    """NEXT-DAY command: generate new stock prices"""
+    print()
+    state.market.next_day()
+    # Tell the main loop to display information table again
+    return True
+
+
+def do_display(state: GameState) -> bool:
+    """DISPLAY command: display stock information table"""
+    display_stock_information_table(state.market, state.money)
+    return False
+
+
+def do_help(_state: GameState) -> bool:
+    """HELP command: display explanation of commands"""
+    # Display explanation of commands
+    # and their aliases
+    print("BUY/B: Buy stock")
+    print("SELL/S: Sell stock")
+    print("INVENTORY/INV: View inventory")
+    print("NEXT-DAY/ND: Go to next day")
+    print("DISPLAY/D: Display stock information")
+    print("HELP/H: View help")
+    return False
+
+
+def do_invalid(_state: GameState) -> bool:
+    """Any command that is not in COMMANDS"""
+    print("Invalid command!")
+    return False
+
+
+# Map every command and its aliases to the function running it
+# Allows user to type shorter commands
+COMMANDS = {
+    alias: function
+    for function, aliases in (
+        (do_buy, ("BUY", "B")),
+        (do_sell, ("SELL", "S")),
+        (do_inventory, ("INVENTORY", "INV")),
+        (do_next_day, ("NEXT-DAY", "ND")),
+        (do_display, ("DISPLAY", "D")),
+        (do_help, ("HELP", "H")),
+    )
+    for alias in aliases
+}
+# Lower case commands are added too, so most inputs do not need str.upper()
+COMMANDS.update({alias.lower(): function for alias, function in COMMANDS.items()})
+
+
+def dispatch(command: str, state: GameState) -> bool:
+    """Run one command inputted by the player
+    Return True if a new day has come and the information table
+    should be displayed again"""
+    function = COMMANDS.get(command)
+    if function is None:
+        # Mixed case commands, e.g. "Buy"
+        function = COMMANDS.get(command.upper(), do_invalid)
+    return function(state)
+
+
+def _non_negative_int(text: str) -> int:
+    """Parse a command line value that cannot be negative, e.g. --days"""
+    if not text.isdecimal():
+        raise argparse.ArgumentTypeError(f"expected a non-negative integer: {text}")
+    return int(text)
+
+
+def _days_and_trials(text: str) -> tuple[int, int]:
+    """Parse the DAYS,TRIALS value of --simulate"""
+    values = text.split(",")
+    if len(values) != 2 or not all(value.isdecimal() for value in values):
+        raise argparse.ArgumentTypeError(
+            "expected DAYS,TRIALS as two non-negative integers"
+        )
+    days, trials = int(values[0]), int(values[1])
+    if trials == 0:
+        # The statistics of 0 trials cannot be calculated
+        raise argparse.ArgumentTypeError("TRIALS must be at least 1")
+    return days, trials
+
+
+def parse_arguments(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments, see USAGE above"""
+    parser = argparse.ArgumentParser(description="Stock Market Simulator")
+    parser.add_argument(
+        "stock_count",
+        nargs="?",
+        type=_non_negative_int,
+        default=STOCK_COUNT,
+        help=f"number of stocks, cannot be negative (default: {STOCK_COUNT})",
+    )
+    parser.add_argument(
+        "--days",
+        metavar="N",
+        type=_non_negative_int,
+        default=HISTORY_DAYS,
+        help="number of days you plan to play, used to preallocate memory for "
+             "the stock history, which still grows if more days are played "
+             "(only used by the game, not by --simulate)",
+    )
+    parser.add_argument(
+        "--simulate",
+        metavar="DAYS,TRIALS",
+        type=_days_and_trials,
+        help="do not start the game, instead simulate the stock prices after DAYS days "
+             "TRIALS times and display the statistics",
+    )
+    parser.add_argument(
+        "--script",
+        metavar="FILE",
+        # argparse opens the file, so a missing file is reported like other errors
+        type=argparse.FileType("r", encoding="utf-8"),
+        help="read commands from FILE, one command per line, instead of the keyboard",
+    )
+    return parser.parse_args(argv)
+
+
+def play(stock_count: int, source: TextIO, days: int = HISTORY_DAYS) -> None:
+    """Start the game, read commands from {source} until there are no more commands
+    See Market.__init__() for the meaning of {days}"""
+    # initialize stock
+    # \n looks ugly
+    print()
+    print("Initializing game....")
+
+    # Initialize the market and all Stocks object inside it
+    state = GameState(Market(stock_count, days), MONEY, source)
+
+    print(f"Number of stocks: {stock_count}")
+    print(f"Default money: {MONEY}")
+    print(f"Default precision: {PRECISION}")
+    print(f"Stock trading fees: {STOCK_TRADE_FEE_PERCENTAGE}%")
+
+    print()
+    print(f"Welcome to Stock Market Simulator {VERSION}!")
+
     while True:
-        inputted_command = input(
-            "Input command (BUY, SELL, INVENTORY, NEXT-DAY, DISPLAY, HELP): "
-        ).upper()
-        # match case is a new feature
-        # so use it
-        match inputted_command:
-            # note: | stands for OR
-            # Allows user to type shorter commands
-            case "BUY" | "B":
-                stock_to_buy = int(input("Input stock index to buy: "))
-                amount_to_buy = int(input("Input amount of stock to buy: "))
-                # See Stock.purchase_test() for explanation
-                if stock_list[stock_to_buy - 1].purchase_test(amount_to_buy, MONEY):
-                    MONEY, fee_deducted = stock_list[stock_to_buy - 1].purchase(
-                        amount_to_buy, MONEY, STOCK_TRADE_FEE_PERCENTAGE
-                    )
-                    print(
-                        f"Successfully bought {amount_to_buy} stock(s)!",
-                        f"Paid {fee_deducted} for trading fees.",
-                    )
-                else:
-                    print("You do not have enough money to buy!")
-            case "SELL" | "S":
-                stock_to_sell = int(input("Input stock index to sell: "))
-                amount_to_sell = int(input("Input amount of stock to sell: "))
-                if stock_list[stock_to_sell - 1].sell_test(amount_to_sell, MONEY):
-                    MONEY, fee_deducted = stock_list[stock_to_sell - 1].purchase(
-                        -amount_to_sell, MONEY, STOCK_TRADE_FEE_PERCENTAGE
-                    )
-                    print(
-                        f"Successfully sold {amount_to_sell} stock(s)!",
-                        f"Paid {fee_deducted} for trading fees.",
-                    )
-                else:
-                    print("You do not have enough stock to sell!")
-            case "INVENTORY" | "INV":
-                # I think we can remove this part of code in newer versions
-                # Since the user can use DISPLAY command to view inventory
-                # This is redundant
-                # But I will keep it here for now
-                print(f"Your current balance is {MONEY}")
-                print("Your current inventory is:")
-                inventory_table = prettytable.PrettyTable()
-                inventory_table.field_names = ["Stock Name", "Inventory"]
-                for stocks in stock_list:
-                    inventory_table.add_row([stocks.name, stocks.inventory])
-                print(inventory_table)
-            case "NEXT-DAY" | "ND":
-                print()
-                for stocks in stock_list:
-                    stocks.next_day()
+        display_stock_information_table(state.market, state.money)
+        while True:
+            try:
+                inputted_command = read_input(
+                    "Input command (BUY, SELL, INVENTORY, NEXT-DAY, DISPLAY, HELP): ",
+                    state.source,
+                )
+                new_day = dispatch(inputted_command, state)
+            except EOFError:
+                # No more commands, end the game
+                return
+            if new_day:
                 # Break the loop to display information table again
                 break
-            case "DISPLAY" | "D":
-                display_stock_information_table(stock_list, MONEY)
-            case "HELP" | "H":
-                # Display explanation of commands
-                # and their aliases
-                print("BUY/B: Buy stock")
-                print("SELL/S: Sell stock")
-                print("INVENTORY/INV: View inventory")
-                print("NEXT-DAY/ND: Go to next day")
-                print("DISPLAY/D: Display stock information")
-                print("HELP/H: View help")
-            case _:
-                print("Invalid command!")
+
+
+def display_simulation(stock_count: int, days: int, trials: int) -> None:
+    """Create a market with {stock_count} stocks, simulate it {trials} times for
+    {days} days using Market.simulate() and display the final price statistics"""
+    market = Market(stock_count)
+    final_prices = market.simulate(days, trials) / PRICE_SCALE
+    print(f"Final stock price after {days} days, {trials} trials:")
+    simulation_table = prettytable.PrettyTable()
+    simulation_table.field_names = [
+        "Index",
+        "Stock name",
+        "Price",
+        "Mean",
+        "Std",
+        "Min",
+        "Max",
+    ]
+    # One row of statistics per stock
+    statistics = np.round(
+        np.stack(
+            [
+                final_prices.mean(axis=0),
+                final_prices.std(axis=0),
+                final_prices.min(axis=0),
+                final_prices.max(axis=0),
+            ],
+            axis=1,
+        ),
+        PRECISION,
+    ).tolist()
+    simulation_table.add_rows(
+        [
+            [stock.index, stock.name, stock.price, *stock_statistics]
+            for stock, stock_statistics in zip(market.stocks, statistics)
+        ]
+    )
+    print(simulation_table)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Parse command line arguments and start the game"""
+    arguments = parse_arguments(argv)
+    if arguments.simulate is not None:
+        display_simulation(arguments.stock_count, *arguments.simulate)
+    elif arguments.script is None:
+        play(arguments.stock_count, sys.stdin, arguments.days)
+    else:
+        with arguments.script as script:
+            play(arguments.stock_count, script, arguments.days)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Tests for stock.py
+USAGE:
+    python -m unittest test_stock
+"""
+
+import random
+import statistics
+import unittest
+
+import numpy as np
+
+import stock
+
+# number of values drawn from each distribution
+SAMPLES = 20000
+
+
+def dice_pseudo_norm(rng: random.Random) -> float:
+    """The old pseudo_norm(), before pseudo_norm_vec() used a normal distribution
+    Average {count} dice rolls between 1-10000, where count is the product of
+    2 dice rolls, see PSEUDO_NORM_MEAN and PSEUDO_NORM_SIGMA in stock.py"""
+    count = rng.randint(1, 6) * rng.randint(1, 6)
+    return sum(rng.randint(1, 10000) for _ in range(count)) / count
+
+
+class TestPseudoNorm(unittest.TestCase):
+    """Check that pseudo_norm_vec() has the same distribution as the old dice rolls"""
+
+    def setUp(self) -> None:
+        """Draw the values with seeded random number generators,
+        so the tests always give the same result"""
+        self.rng = stock._RNG  # pylint: disable=protected-access
+        stock._RNG = np.random.default_rng(15342335)  # pylint: disable=protected-access
+        self.values = stock.pseudo_norm_vec(SAMPLES)
+        dice_rng = random.Random(15342335)
+        self.dice_values = [dice_pseudo_norm(dice_rng) for _ in range(SAMPLES)]
+
+    def tearDown(self) -> None:
+        stock._RNG = self.rng  # pylint: disable=protected-access
+
+    def test_range(self) -> None:
+        """Values are between 1-10000, like the dice rolls"""
+        self.assertEqual(self.values.shape, (SAMPLES,))
+        self.assertGreaterEqual(self.values.min(), 1)
+        self.assertLessEqual(self.values.max(), 10000)
+
+    def test_mean(self) -> None:
+        """Both distributions are centered at 5000.5"""
+        self.assertAlmostEqual(self.values.mean(), stock.PSEUDO_NORM_MEAN, delta=30)
+        self.assertAlmostEqual(
+            statistics.fmean(self.dice_values), stock.PSEUDO_NORM_MEAN, delta=30
+        )
+
+    def test_std(self) -> None:
+        """Both distributions have a standard deviation of about 1179,
+        but the dice rolls have heavier tails, so their histograms differ"""
+        self.assertAlmostEqual(
+            self.values.std(),
+            stock.PSEUDO_NORM_SIGMA,
+            delta=0.03 * stock.PSEUDO_NORM_SIGMA,
+        )
+        self.assertAlmostEqual(
+            statistics.pstdev(self.dice_values),
+            stock.PSEUDO_NORM_SIGMA,
+            delta=0.03 * stock.PSEUDO_NORM_SIGMA,
+        )
+
+
+
+def day_values(before: np.ndarray, after: np.ndarray) -> np.ndarray:
+    """Undo one day of price changes, return the pseudo-normal values between
+    1-10000 that changed the prices from {before} to {after}"""
+    return (after - before) / before * 10000 + 5000
+
+
+class TestMarket(unittest.TestCase):
+    """Check the prices generated by Market, which use the numba kernels when
+    numba is installed, instead of pseudo_norm_vec()
+    The numba random number generator cannot be seeded for all CPU cores,
+    so the tolerances are wide enough for any seed"""
+
+    def check_distribution(self, values: np.ndarray) -> None:
+        """Values have the mean and standard deviation of pseudo_norm_vec()"""
+        self.assertEqual(values.size, SAMPLES)
+        self.assertAlmostEqual(values.mean(), stock.PSEUDO_NORM_MEAN, delta=50)
+        self.assertAlmostEqual(
+            values.std(),
+            stock.PSEUDO_NORM_SIGMA,
+            delta=0.05 * stock.PSEUDO_NORM_SIGMA,
+        )
+
+    def test_next_day(self) -> None:
+        """Prices of NEXT-DAY change like in pseudo_norm_vec()"""
+        market = stock.Market(SAMPLES)
+        before = market.prices.copy()
+        market.next_day()
+        self.check_distribution(day_values(before, market.prices))
+
+    def test_simulate(self) -> None:
+        """Prices of --simulate change like in pseudo_norm_vec()"""
+        market = stock.Market(10)
+        final_prices = market.simulate(1, SAMPLES // 10)
+        self.check_distribution(day_values(market.prices, final_prices))
+
+    def test_validate_state(self) -> None:
+        """Market data still makes sense after playing for a while,
+        including a market with no stocks"""
+        for count in (10, 0):
+            market = stock.Market(count, days=5)
+            # More days than the history has space for, so it has to grow
+            for _ in range(20):
+                market.next_day()
+                market.validate_state()
+            self.assertEqual(market.history.shape, (21, count))
+
+
+if __name__ == "__main__":
+    unittest.main()